@@ -4,12 +4,47 @@ This module is responsible for loading the auto-completor archive data
 @Author: Gal Helner
 """
 import os
-import json
+import pickle
+import re
 import time
-from typing import List, Any
+from array import array
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
 
 # constants
-DEFAULT_CACHE_FILE = "sentences_cache.json"
+DEFAULT_CACHE_FILE = "sentences_cache.pickle"
+ARCHIVE_FILE_EXTENSION = ".txt"
+WORD_RE = re.compile(r"\w+")
+# bumped whenever the cached columns or postings change meaning
+CACHE_FORMAT_VERSION = 2
+# re.IGNORECASE equivalences that str.lower() keeps apart (CPython's re._casefix); every pair
+# maps a word character to a word character, so folding keeps the words of a text intact
+CASE_FOLD_TABLE = str.maketrans({
+    '\u0131': 'i',  # dotless i
+    '\u017f': 's',  # long s
+    '\u00b5': '\u03bc',  # micro sign -> mu
+    '\u1fbe': '\u03b9', '\u1fd3': '\u0390', '\u1fe3': '\u03b0',  # Greek iota variants
+    '\u03d0': '\u03b2', '\u03f5': '\u03b5', '\u03d1': '\u03b8', '\u03f0': '\u03ba',
+    '\u03d6': '\u03c0', '\u03f1': '\u03c1', '\u03c2': '\u03c3', '\u03d5': '\u03c6',  # Greek symbol forms, final sigma
+    '\u1c80': '\u0432', '\u1c81': '\u0434', '\u1c82': '\u043e', '\u1c83': '\u0441',
+    '\u1c84': '\u0442', '\u1c85': '\u0442', '\u1c86': '\u044a', '\u1c87': '\u0463',
+    '\u1c88': '\ua64b',  # old Cyrillic letter forms
+    '\u1e9b': '\u1e61',  # long s with dot above
+    '\ufb05': '\ufb06',  # st ligatures
+})
+
+
+def fold_case(text: str) -> str:
+    """
+    Lowercase a text so that characters equal under re.IGNORECASE become the same character.
+    Only İ and U+0345 are left apart: re matches them to i and ι, which str.lower() cannot
+    produce as one character of the same word class.
+    :param text: The text to fold.
+    :return: The folded text, as long as text.lower().
+    """
+    lowered = text.lower()
+    return lowered if lowered.isascii() else lowered.translate(CASE_FOLD_TABLE)
 
 
 class Sentence:
@@ -39,6 +74,26 @@ class Sentence:
         return f'{self.content} ({source_name} {self.offset})'
 
 
+class SentenceTable(Sequence):
+    """
+    A column oriented store of the archive sentences.
+    Sentence objects are only created when an item is accessed.
+    """
+    def __init__(self, contents: List[str], source_paths: List[str], source_ids: array, offsets: array):
+        self.contents = contents
+        self.source_paths = source_paths
+        self.source_ids = source_ids
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.contents)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return Sentence(self.contents[index], self.source_paths[self.source_ids[index]], self.offsets[index])
+
+
 class Reader:
     """
     A class to read the auto-completor archive data
@@ -46,45 +101,166 @@ class Reader:
     def __init__(self, archive_path: str, cache_filepath: str = DEFAULT_CACHE_FILE):
         self.archive_path = archive_path
         self.cache_filepath = cache_filepath
-        self.sentences = []
+        self.sentences = SentenceTable([], [], array('i'), array('i'))
+        self.postings = {}
         self.read_sentences_with_metadata()
 
-    def read_sentences_with_metadata(self) -> List[Sentence]:
+    def read_sentences_with_metadata(self) -> SentenceTable:
         """
-        Read the auto-completor archive data and store it in a python list.
-        If data is already written in cache json file, reading straight from it.
-        Otherwise, read the raw data from the archive directory.
-        :return: A list of Sentence objects containing the whole archive data
+        Read the auto-completor archive data and store it in a sentence table.
+        The word postings of the sentences are built alongside.
+        If the cache file was built from the current archive content, reading straight from it.
+        Otherwise, read the raw data from the archive directory and rebuild the cache.
+        :return: A SentenceTable containing the whole archive data
         """
-        if os.path.exists(self.cache_filepath):
-            # read data from cache json file
-            with open(self.cache_filepath, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                self.sentences = [Sentence(**item) for item in data]
+        signature = self._archive_signature()
+        cached = self._load_cache(signature)
+        if cached is None:
+            columns = self._read_archive([filepath for filepath, _, _ in signature])
+            postings = self._build_postings(columns[0])
+            self._save_cache(signature, columns, postings)
         else:
-            # read data from archive directory
-            self.sentences = []
-            for dirpath, _, filenames in os.walk(self.archive_path):
-                for filename in filenames:
-                    if filename.endswith(".txt"):
-                        filepath = os.path.join(dirpath, filename)
-                        with open(filepath, 'r', encoding='utf-8') as f:
-                            for i, line in enumerate(f, start=1):
-                                clean_line = line.strip()
-                                if clean_line:
-                                    self.sentences.append(Sentence(clean_line, filepath, i))
-            # save data to cache json file
-            with open(self.cache_filepath, 'w', encoding='utf-8') as f:
-                json.dump([s.to_dict() for s in self.sentences], f, ensure_ascii=False, indent=2)
+            columns, postings = cached
+        self.sentences = SentenceTable(*columns)
+        self.postings = postings
         return self.sentences
 
-    def get_sentences(self) -> List[Sentence]:
+    def _archive_files(self) -> List[os.DirEntry]:
+        """
+        Collect the archive text files in walking order (the order of os.walk).
+        The directories are listed with os.scandir, so the file entries keep the type
+        and stat information the listing already returned.
+        :return: A list of the directory entries of the archive text files.
+        """
+        entries = []
+        directories = [self.archive_path]
+        while directories:
+            subdirectories = []
+            try:
+                scan = os.scandir(directories.pop())
+            except OSError:
+                # like os.walk, skip a directory that cannot be listed
+                continue
+            with scan:
+                for entry in scan:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        is_dir = False
+                    if is_dir:
+                        # like os.walk, do not follow symbolic links to directories
+                        if not entry.is_symlink():
+                            subdirectories.append(entry.path)
+                    elif entry.name.endswith(ARCHIVE_FILE_EXTENSION):
+                        entries.append(entry)
+            # the first subdirectory has to be walked first, so it goes last on the stack
+            directories.extend(reversed(subdirectories))
+        return entries
+
+    def _archive_signature(self) -> List[Tuple[str, int, int]]:
+        """
+        Describes the current archive content, used to validate the cache file.
+        :return: A list of (path, modification time, size) tuples for every archive text file.
+        """
+        signature = []
+        for entry in self._archive_files():
+            stat = entry.stat()
+            signature.append((entry.path, stat.st_mtime_ns, stat.st_size))
+        return signature
+
+    def _read_archive(self, filepaths: List[str]) -> Tuple[List[str], List[str], array, array]:
+        """
+        Read the raw data from the archive text files.
+        The files are read concurrently by a thread pool, in the given order.
+        :param filepaths: The archive text file paths, in archive walking order.
+        :return: The sentences as columns: contents, the distinct source paths,
+                 the source path index of every sentence and the line offsets.
+        """
+        contents, source_paths, source_ids, offsets = [], [], array('i'), array('i')
+        with ThreadPoolExecutor() as executor:
+            for filepath, lines in zip(filepaths, executor.map(self._read_file, filepaths)):
+                source_id = len(source_paths)
+                source_paths.append(filepath)
+                for i, clean_line in lines:
+                    contents.append(clean_line)
+                    source_ids.append(source_id)
+                    offsets.append(i)
+        return contents, source_paths, source_ids, offsets
+
+    @staticmethod
+    def _read_file(filepath: str) -> List[Tuple[int, str]]:
+        """
+        Read the non-empty lines of a single archive file.
+        :param filepath: The archive file path.
+        :return: A list of (line number, stripped line) tuples.
+        """
+        with open(filepath, 'r', encoding='utf-8') as f:
+            # one decode of the whole file; text mode already turns every line ending into '\n'
+            data = f.read()
+        lines = []
+        for i, line in enumerate(data.split('\n'), start=1):
+            clean_line = line.strip()
+            if clean_line:
+                lines.append((i, clean_line))
+        return lines
+
+    @staticmethod
+    def _build_postings(contents: List[str]) -> Dict[str, array]:
         """
-        Getter method for the sentence list
-        :return: A list of Sentence objects.
+        Build the inverted index of the case-folded words of the sentences (see fold_case).
+        :param contents: The sentence contents.
+        :return: A dictionary from word to the ascending ids of the sentences containing it.
+        """
+        postings = {}
+        for sentence_id, content in enumerate(contents):
+            for word in set(WORD_RE.findall(fold_case(content))):
+                sentence_ids = postings.get(word)
+                if sentence_ids is None:
+                    sentence_ids = postings[word] = array('i')
+                sentence_ids.append(sentence_id)
+        return postings
+
+    def _load_cache(self, signature: List[Tuple[str, int, int]]) -> Optional[Tuple]:
+        """
+        Load the sentence columns and word postings from the cache file.
+        :param signature: The current archive signature.
+        :return: The cached (columns, postings), or None if the cache is missing or outdated.
+        """
+        if not os.path.exists(self.cache_filepath):
+            return None
+        try:
+            with open(self.cache_filepath, 'rb') as f:
+                version, cached_signature, columns, postings = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        if version != CACHE_FORMAT_VERSION or cached_signature != signature:
+            return None
+        return columns, postings
+
+    def _save_cache(self, signature: List[Tuple[str, int, int]], columns: Tuple, postings: Dict[str, array]):
+        """
+        Save the sentence columns and word postings to the cache file together with the archive signature.
+        :param signature: The current archive signature.
+        :param columns: The sentence columns to save.
+        :param postings: The word postings to save.
+        """
+        with open(self.cache_filepath, 'wb') as f:
+            pickle.dump((CACHE_FORMAT_VERSION, signature, columns, postings), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def get_sentences(self) -> SentenceTable:
+        """
+        Getter method for the sentence table
+        :return: A SentenceTable of the archive sentences.
         """
         return self.sentences
 
+    def get_postings(self) -> Dict[str, array]:
+        """
+        Getter method for the word postings
+        :return: A dictionary from case-folded word to the ascending ids of the sentences containing it.
+        """
+        return self.postings
+
 
 if __name__ == "__main__":
     # simple data loading example with time measurement
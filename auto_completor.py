@@ -1,11 +1,36 @@
 """
 Module that search the best completion in the data structure for a specific input
 """
-from typing import List, Tuple
+from typing import Iterator, List, Optional, Sequence, Tuple
+from array import array
 import archive_reader
+import bisect
+import functools
+import heapq
+import itertools
+import operator
 import string
 import re
 import os
+import sys
+
+# constants
+SENTENCE_SEPARATOR = "\n"
+MAX_COMPLETIONS = 5
+FUZZY_REGEX_CACHE_SIZE = 256
+PERFECT_MATCH_CACHE_SIZE = 1024
+SCORE_CACHE_SIZE = 4096
+COMPLETIONS_CACHE_SIZE = 1024
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+PLAIN_WORDS_RE = re.compile(r"\w+(?: \w+)*")
+# fuzzy candidates come from the postings while they cover at most 1/POSTINGS_SCAN_RATIO of the sentences
+POSTINGS_SCAN_RATIO = 20
+# re.IGNORECASE matches İ to i and U+0345 to ι, which archive_reader.fold_case cannot express;
+# queries are folded through this table first, and sentences holding them are always fuzzy candidates
+UNFOLDABLE_CASE_TABLE = str.maketrans({'\u0130': 'i', '\u0345': '\u03b9'})
+# penalties by 0-based position, the last entry applies to every later position
+INCORRECT_LETTER_PENALTIES = (5, 4, 3, 2, 1)
+MISSING_OR_ADDED_PENALTIES = (10, 8, 6, 4, 2)
 
 
 class AutoCompleteData:
@@ -19,6 +44,9 @@ class AutoCompleteData:
                matched_substring: The original user query (normalized string used for matching).
                match_span: (start, end) indices in `completed_sentence` of the matched region.
            """
+    # one instance is created per hit, so instances skip the per-object __dict__
+    __slots__ = ('completed_sentence', 'source_text', 'offset', 'score', 'matched_substring', 'match_span')
+
     def __init__(self,
                  completed_sentence: str,
                  source_text: str,
@@ -49,6 +77,142 @@ class AutoCompletor:
         self.archive_path = archive_path
         self.reader = archive_reader.Reader(archive_path)
         self.sentences = self.reader.get_sentences()
+        self.postings = self.reader.get_postings()
+        self._build_search_buffer()
+        self._build_vocabulary()
+        # per instance, so completors never share entries; the cache holds the bound method,
+        # so the completor and its cache form a cycle that only the cyclic garbage collector frees
+        self._cached_best_completions = functools.lru_cache(maxsize=COMPLETIONS_CACHE_SIZE)(
+            self._best_completions)
+
+    def _build_search_buffer(self):
+        """Lowercase every sentence once and join them into one buffer for bulk scans.
+
+                `_contents_lower` keeps the lowercased sentences as a column parallel to
+                `sentences.contents`. The joined buffer holds them case-folded like the
+                postings and UTF-8 encoded, separated by `SENTENCE_SEPARATOR`, which never
+                occurs inside an archive line, and
+                `_sentence_starts` keeps the byte index where each sentence begins so a
+                hit position can be mapped back to its sentence.
+
+                A str buffer would take 4 bytes per character as soon as one sentence holds
+                a character outside the BMP; as bytes it stays close to the archive size.
+
+                `_unfoldable_ids` lists the sentences holding a character of
+                `UNFOLDABLE_CASE_TABLE`, which the case-folded prefilters cannot vouch for.
+                """
+        self._contents_lower = [content.lower() for content in self.sentences.contents]
+        self._unfoldable_ids = [index for index, content in enumerate(self.sentences.contents)
+                                if not content.isascii() and _has_unfoldable_case(content)]
+        fold_table = archive_reader.CASE_FOLD_TABLE
+        encoded = [(text_lower if text_lower.isascii() else text_lower.translate(fold_table)).encode()
+                   for text_lower in self._contents_lower]
+        separator = SENTENCE_SEPARATOR.encode()
+        # start of sentence i = byte lengths of the sentences before it + i separators
+        lengths_before = itertools.accumulate(map(len, encoded), initial=0)
+        separators_before = range(0, len(encoded) * len(separator), len(separator))
+        self._sentence_starts = array('q', map(operator.add, lengths_before, separators_before))
+        self._search_buffer = separator.join(encoded)
+
+    def _build_vocabulary(self):
+        """Group the indexed words by length, each group joined into one buffer.
+
+                One-edit lookups only need the words whose length is within one of the
+                looked up word, and scanning a joined buffer keeps the regex work in C.
+                """
+        words_by_length = {}
+        for word in self.postings:
+            words_by_length.setdefault(len(word), []).append(word)
+        self._vocabulary = {length: SENTENCE_SEPARATOR.join(words)
+                            for length, words in words_by_length.items()}
+
+    def _one_edit_words(self, word: str) -> List[str]:
+        """Return the indexed words at most one edit away from `word`.
+
+                Args:
+                    word: Case-folded word (it may contain spaces, indexed words never do).
+
+                Returns:
+                    The matching indexed words.
+                """
+        regex = _build_word_regex(word)
+        found = []
+        for length in (len(word) - 1, len(word), len(word) + 1):
+            words = self._vocabulary.get(length)
+            if words:
+                found.extend(regex.findall(words))
+        return found
+
+    def _find_substring(self, q_folded: str) -> Iterator[int]:
+        """Yield every sentence whose case-folded text contains `q_folded`.
+
+                The scan runs `bytes.find` over the joined buffer, so sentences without a
+                hit are skipped in C instead of being visited one by one. UTF-8 is
+                self-synchronizing, so a byte-level hit is always a character-level hit.
+
+                Args:
+                    q_folded: Query folded by `_fold_query`, without line separators.
+
+                Yields:
+                    Sentence indices, in archive order.
+                """
+        buffer = self._search_buffer
+        starts = self._sentence_starts
+        if not starts:
+            return
+        if not q_folded:
+            # every sentence contains the empty string
+            yield from range(len(starts))
+            return
+        # a lone surrogate cannot occur in the archive, so it simply never matches
+        needle = q_folded.encode('utf-8', 'surrogatepass')
+        position = buffer.find(needle)
+        while position != -1:
+            index = bisect.bisect_right(starts, position) - 1
+            yield index
+            if index + 1 == len(starts):
+                break
+            position = buffer.find(needle, starts[index + 1])
+
+    def _exact_candidates(self, q_lower: str) -> Iterator[Tuple[int, int]]:
+        """Yield the sentences containing `q_lower` that may be a perfect match.
+
+                A perfect match holds every query word as a whole word, so only the
+                sentences in the intersection of the query words' postings are checked.
+
+                Args:
+                    q_lower: Lowercased, normalized query.
+
+                Yields:
+                    (sentence index, start of the first occurrence within that sentence),
+                    in archive order.
+                """
+        # the postings hold case-folded words; folding keeps the words of the lowercased text
+        words = set(archive_reader.WORD_RE.findall(archive_reader.fold_case(q_lower)))
+        if not words:
+            return
+        postings = [self.postings.get(word) for word in words]
+        if any(sentence_ids is None for sentence_ids in postings):
+            return
+        postings.sort(key=len)
+        candidates = postings[0]
+        if len(postings) > 1:
+            common = set(candidates)
+            for sentence_ids in postings[1:]:
+                common.intersection_update(sentence_ids)
+            candidates = sorted(common)
+        for index in candidates:
+            start = self._contents_lower[index].find(q_lower)
+            if start != -1:
+                yield index, start
+
+    def _is_word_bounded(self, index: int, start: int, length: int) -> bool:
+        """Check that [start, start + length) of a lowercased sentence is not glued to word characters."""
+        text_lower = self._contents_lower[index]
+        end = start + length
+        left_ok = start == 0 or not _is_word_char(text_lower[start - 1])
+        right_ok = end == len(text_lower) or not _is_word_char(text_lower[end])
+        return left_ok and right_ok
 
     def search(self, substring: str) -> List[AutoCompleteData]:
         """Find exact and fuzzy matches for a query across all sentences.
@@ -56,8 +220,9 @@ class AutoCompletor:
                The search proceeds in two phases:
                  1) Exact phrase/word match (case-insensitive, punctuation/spacing tolerant).
                  2) If fewer than 5 results were found, run a fuzzy search allowing a single
-                    edit (insertion, deletion, or substitution) guided by a regex built by
-                    `build_regex()`, then score candidates with `calc_score()`.
+                    edit (insertion, deletion, or substitution): `find_one_edit_match()` for
+                    ASCII sentences, the regex built by `build_regex()` otherwise. The
+                    matched text is then scored with `calc_score()`.
 
                Duplicates are avoided with a set keyed by full sentence text.
 
@@ -67,43 +232,46 @@ class AutoCompletor:
                Returns:
                    A list of `AutoCompleteData` objects (unsorted).
                """
-        substring = re.sub(r"\s+", " ", substring).strip()
-        substring = re.sub(r",", "", substring).strip()
+        return self._search_normalized(_normalize_query(substring))
+
+    def _search_normalized(self, substring: str) -> List[AutoCompleteData]:
+        """Run `search` on a query already passed through `_normalize_query`.
+
+                Normalizing is not idempotent ("a , b" becomes "a  b", then "a b"), so
+                a normalized query must not be normalized again.
+                """
         results: List[AutoCompleteData] = []
         set_of_seen = set()
         q_lower = substring.lower()
-        for sentence in self.sentences:
-            text = sentence.content
-            tl = text.lower()
-
-            if q_lower in tl:
-                if is_perfect_match(substring, text):
-                    start = tl.index(q_lower)
-                    end = start + len(substring)
-                    score = len(substring) * 2
-                    results.append(AutoCompleteData(
-                        completed_sentence=text,
-                        source_text=sentence.source_path,
-                        offset=sentence.offset,
-                        score=score,
-                        matched_substring=substring,
-                        match_span=(start, end),
-                    ))
-                    set_of_seen.add(text)
-                    continue
-
-        if not results or len(results) < 5:
-            fuzzy_rx = self.build_regex(substring)
-            fuzzy_candidates = self.search_sentences(substring)
+        # for plain words the hit itself is a perfect match once it is bounded by non-word characters
+        plain_words = PLAIN_WORDS_RE.fullmatch(q_lower) is not None
+        # compiled once per query; None for a query without words, but `_exact_candidates`
+        # yields nothing for such a query, so `perfect_re.search` is never reached with None
+        perfect_re = _perfect_match_pattern(q_lower)
+        contents = self.sentences.contents
+        for index, start in self._exact_candidates(q_lower):
+            text = contents[index]
+            bounded = plain_words and self._is_word_bounded(index, start, len(q_lower))
+
+            if bounded or perfect_re.search(self._contents_lower[index]):
+                sentence = self.sentences[index]
+                end = start + len(substring)
+                score = len(substring) * 2
+                results.append(AutoCompleteData(
+                    completed_sentence=text,
+                    source_text=sentence.source_path,
+                    offset=sentence.offset,
+                    score=score,
+                    matched_substring=substring,
+                    match_span=(start, end),
+                ))
+                set_of_seen.add(text)
 
-            for s in fuzzy_candidates:
-                m = fuzzy_rx.search(s.content)
-                if not m:
-                    continue
-                start, end = m.span()
-                matched_text = s.content[start:end]
+        if len(results) < MAX_COMPLETIONS:
+            for s, (start, end) in self._fuzzy_matches(substring):
                 if s.content in set_of_seen:
                     continue
+                matched_text = s.content[start:end]
                 score = calc_score(substring, matched_text)
 
                 results.append(AutoCompleteData(
@@ -127,6 +295,7 @@ class AutoCompletor:
                     - Exact match: the query itself.
 
                 Word boundaries (\\b) are used so the match aligns to whole tokens.
+                Compiled patterns are memoized per query.
 
                 Args:
                     query: The string to build a one-edit regex for.
@@ -134,41 +303,131 @@ class AutoCompletor:
                 Returns:
                     A compiled, case-insensitive `re.Pattern`.
                 """
-        q = query
-        parts = []
+        return _build_fuzzy_regex(query)
 
-        for i in range(len(q) + 1):
-            left = re.escape(q[:i])
-            right = re.escape(q[i:])
-            parts.append(f"{left}.{right}")
+    def search_sentences(self, query):
+        """Return sentence records that match the fuzzy regex for `query`.
 
-        for i in range(len(q)):
-            left = re.escape(q[:i])
-            right = re.escape(q[i + 1:])
-            parts.append(f"{left}.{right}")
+                Args:
+                    query: The input string to search for.
 
-        for i in range(len(q)):
-            left = re.escape(q[:i])
-            right = re.escape(q[i + 1:])
-            parts.append(f"{left}{right}")
+                Returns:
+                    A list of sentence objects from `self.sentences` whose `content`
+                    matches the pattern produced by `build_regex(query)`.
+                """
+        return [s for s, _ in self._fuzzy_matches(query)]
 
-        parts.append(re.escape(q))
+    def _fuzzy_matches(self, query: str) -> Iterator[Tuple[archive_reader.Sentence, Tuple[int, int]]]:
+        """Yield sentences matching the fuzzy regex for `query` with the match span.
 
-        union = "|".join(parts)
-        return re.compile(rf"\b(?:{union})\b", re.IGNORECASE)
+                ASCII sentences are matched with `find_one_edit_match` on the lowercased
+                text, which finds the same span as the regex. The regex is only compiled
+                when a sentence or the query is not ASCII.
 
-    def search_sentences(self, query):
-        """Return sentence records that match the fuzzy regex for `query`.
+                Args:
+                    query: The input string to search for.
+
+                Yields:
+                    (sentence, (start, end)) pairs in archive order.
+                """
+        q_lower = query.lower()
+        ascii_query = len(query) >= 2 and query.isascii()
+        regex = None
+        contents = self.sentences.contents
+        for index in self._fuzzy_candidate_ids(query):
+            content = contents[index]
+            if ascii_query and content.isascii():
+                span = find_one_edit_match(q_lower, self._contents_lower[index])
+            else:
+                if regex is None:
+                    regex = self.build_regex(query)
+                m = regex.search(content)
+                span = m.span() if m else None
+            if span:
+                yield self.sentences[index], span
+
+    def _fuzzy_candidate_ids(self, query: str) -> List[int]:
+        """Return the ids of sentences that may hold a one-edit variant of `query`.
+
+                A single edit can only touch one half of the query, so every fuzzy match
+                contains the other half verbatim. Looking both halves up in the joined
+                buffer skips sentences the regex could never match.
+
+                The regex compares case like `re.IGNORECASE`, so the postings lookup and the
+                buffer scan use the case-folded query, and sentences in `_unfoldable_ids` are
+                always included.
 
                 Args:
                     query: The input string to search for.
 
                 Returns:
-                    A list of sentence objects from `self.sentences` whose `content`
-                    matches the pattern produced by `build_regex(query)`.
+                    Sorted sentence indices containing at least one half of `query`.
+                """
+        ids = self._indexed_fuzzy_candidate_ids(_fold_query(query))
+        if ids is None:
+            middle = len(query) // 2
+            ids = set()
+            for piece in (query[:middle], query[middle:]):
+                ids.update(self._find_substring(_fold_query(piece)))
+            ids = sorted(ids)
+        if self._unfoldable_ids:
+            ids = sorted(set(ids).union(self._unfoldable_ids))
+        return ids
+
+    def _indexed_fuzzy_candidate_ids(self, q_folded: str) -> Optional[List[int]]:
+        """Collect the fuzzy candidates of a plain-words query from the word postings.
+
+                A single edit touches at most two adjacent query words, and every other
+                word still appears in the sentence as a whole word:
+                  - 3+ words: for each adjacent pair, some word outside it is intact, so the
+                    postings of the rarest word outside each pair cover every match.
+                  - 2 words: either one of the words is intact, or the space was edited
+                    into a single indexed word one edit away from the query.
+                  - 1 word: the match is an indexed word one edit away, or the word split
+                    in two indexed words by an inserted or substituted non-word character.
+
+                Args:
+                    q_folded: Case-folded query, see `_fold_query`.
+
+                Returns:
+                    Sorted candidate sentence indices, or None when the query is not plain
+                    words or the postings would not narrow the candidates enough.
+                """
+        if len(q_folded) < 2 or PLAIN_WORDS_RE.fullmatch(q_folded) is None:
+            return None
+        words = q_folded.split(" ")
+        groups = []
+        if len(words) >= 3:
+            for i in range(len(words) - 1):
+                outside = [self.postings.get(word) for word in words[:i] + words[i + 2:]]
+                if all(sentence_ids is not None for sentence_ids in outside):
+                    groups.append(min(outside, key=len))
+        else:
+            groups.extend(self.postings[word] for word in self._one_edit_words(q_folded))
+            if len(words) == 2:
+                groups.extend(self.postings.get(word, ()) for word in words)
+            else:
+                groups.extend(self._split_word_ids(q_folded))
+        if sum(map(len, groups)) * POSTINGS_SCAN_RATIO > len(self.sentences):
+            return None
+        return sorted(set().union(*groups))
+
+    def _split_word_ids(self, word: str) -> List[List[int]]:
+        """Return the ids of sentences holding both parts of `word` split at some position.
+
+                Covers a non-word character inserted inside `word` or substituted for one
+                of its inner letters.
                 """
-        regex = self.build_regex(query)
-        return [s for s in self.sentences if regex.search(s.content)]
+        groups = []
+        for i in range(1, len(word)):
+            left = self.postings.get(word[:i])
+            if left is None:
+                continue
+            for right_word in (word[i:], word[i + 1:]):
+                right = self.postings.get(right_word)
+                if right_word and right is not None:
+                    groups.append(_intersect_ids(left, right))
+        return groups
 
     def get_text(self, r):
         """Normalize a result object to lowercase text for sorting.
@@ -197,15 +456,101 @@ class AutoCompletor:
                     1) Primary: descending `score`
                     2) Secondary: alphabetical order of normalized text
 
+                Only the top five are selected (`heapq.nsmallest`), ties keep search order.
+                `search` only returns `AutoCompleteData`, so the key reads
+                `completed_sentence` directly instead of going through `get_text`.
+
+                Results are cached by the normalized input, so inputs that differ only in
+                spacing or commas share one entry.
+
                 Args:
                     prefix: User's current input.
 
                 Returns:
                     Top five `AutoCompleteData` items after sorting.
                 """
-        hits = self.search(prefix)
-        hits.sort(key=lambda r: (-r.score, self.get_text(r)))
-        return hits[:5]
+        return list(self._cached_best_completions(_normalize_query(prefix)))
+
+    def clear_cache(self):
+        """Drop the cached completions, so the next `get_best_k_completions` searches again."""
+        self._cached_best_completions.cache_clear()
+
+    def _best_completions(self, query: str) -> Tuple[AutoCompleteData, ...]:
+        """Rank the hits of a normalized query, see `get_best_k_completions`."""
+        hits = self._search_normalized(query)
+        return tuple(heapq.nsmallest(MAX_COMPLETIONS, hits, key=_ranking_key))
+
+
+def _fold_query(query: str) -> str:
+    """Fold a query the way `re.IGNORECASE` compares it to the case-folded sentences."""
+    return archive_reader.fold_case(query.translate(UNFOLDABLE_CASE_TABLE))
+
+
+def _has_unfoldable_case(text: str) -> bool:
+    """Check whether `text` holds a character that `archive_reader.fold_case` leaves apart."""
+    return any(chr(code) in text for code in UNFOLDABLE_CASE_TABLE)
+
+
+def _normalize_query(substring: str) -> str:
+    """Collapse whitespace and drop commas, the way `search` matches its input."""
+    # str.split() splits on the same characters as the regex \s+ and drops the ends
+    substring = " ".join(substring.split())
+    # every hit stores the query, interning lets them share one string
+    return sys.intern(substring.replace(",", "").strip())
+
+
+def _ranking_key(r: AutoCompleteData) -> Tuple[int, str]:
+    """Sort key of a hit: descending score, then lowercase sentence text."""
+    return -r.score, r.completed_sentence.lower()
+
+
+@functools.lru_cache(maxsize=FUZZY_REGEX_CACHE_SIZE)
+def _build_fuzzy_regex(query: str) -> re.Pattern:
+    """Compile the one-edit regex for `query`, see `AutoCompletor.build_regex`."""
+    return re.compile(rf"\b(?:{_one_edit_union(query)})\b", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=FUZZY_REGEX_CACHE_SIZE)
+def _build_word_regex(word: str) -> re.Pattern:
+    """Compile a regex matching whole lines that are one edit away from `word`."""
+    return re.compile(rf"^(?:{_one_edit_union(word)})$", re.MULTILINE)
+
+
+def _one_edit_union(query: str) -> str:
+    """Build the regex alternation of every insertion, substitution and deletion of `query`."""
+    q = query
+    parts = []
+
+    for i in range(len(q) + 1):
+        left = re.escape(q[:i])
+        right = re.escape(q[i:])
+        parts.append(f"{left}.{right}")
+
+    for i in range(len(q)):
+        left = re.escape(q[:i])
+        right = re.escape(q[i + 1:])
+        parts.append(f"{left}.{right}")
+
+    for i in range(len(q)):
+        left = re.escape(q[:i])
+        right = re.escape(q[i + 1:])
+        parts.append(f"{left}{right}")
+
+    parts.append(re.escape(q))
+
+    return "|".join(parts)
+
+
+def _intersect_ids(a: Sequence[int], b: Sequence[int]) -> List[int]:
+    """Intersect two ascending id sequences, binary searching the longer one."""
+    if len(a) > len(b):
+        a, b = b, a
+    common = []
+    for sentence_id in a:
+        i = bisect.bisect_left(b, sentence_id)
+        if i < len(b) and b[i] == sentence_id:
+            common.append(sentence_id)
+    return common
 
 
 def is_perfect_match(query: str, sentence: str) -> bool:
@@ -218,13 +563,97 @@ def is_perfect_match(query: str, sentence: str) -> bool:
       "MY   NAME"
       "my - name"
     """
-    tokens = re.findall(r"\w+", query.lower())
-    if not tokens:
+    pattern = _perfect_match_pattern(query.lower())
+    if pattern is None:
         return False
-    pattern = r"\b" + r"\W+".join(map(re.escape, tokens)) + r"\b"
-    return re.search(pattern, sentence.lower()) is not None
+    return pattern.search(sentence.lower()) is not None
+
 
+def _is_word_char(char: str) -> bool:
+    """Return True for the characters matched by `\\w` in a str pattern."""
+    return char.isalnum() or char == "_"
 
+
+def _is_word_boundary(text: str, position: int) -> bool:
+    """Return True where `\\b` matches in `text`."""
+    left = position > 0 and _is_word_char(text[position - 1])
+    right = position < len(text) and _is_word_char(text[position])
+    return left != right
+
+
+def find_one_edit_match(query: str, text: str) -> Optional[Tuple[int, int]]:
+    """Find the span the `build_regex(query)` pattern matches in `text`, without a regex.
+
+        A match that keeps the first half of `query` intact starts where that half
+        occurs; one that edits the first half ends with the intact second half, so it
+        starts one character around `middle` before it. Those are the only start
+        positions tried, left to right. At a start position the prefix and suffix shared
+        with `query` decide each edit family in the regex alternation order:
+        insertion, substitution (which also covers the query itself), then deletion.
+
+        The comparison is exact, so for case-insensitive matching both strings must be
+        lowercased ASCII, where lowercasing agrees with `re.IGNORECASE`.
+
+        Args:
+            query: Lowercased query, at least two characters long.
+            text: Lowercased sentence.
+
+        Returns:
+            (start, end) of the leftmost match, or None if there is none.
+        """
+    size = len(query)
+    middle = size // 2
+    head, tail = query[:middle], query[middle:]
+    starts = set()
+    position = text.find(head)
+    while position != -1:
+        starts.add(position)
+        position = text.find(head, position + 1)
+    position = text.find(tail)
+    while position != -1:
+        for start in (position - middle - 1, position - middle, position - middle + 1):
+            if start >= 0:
+                starts.add(start)
+        position = text.find(tail, position + 1)
+
+    for start in sorted(starts):
+        if not _is_word_boundary(text, start):
+            continue
+        prefix = _common_prefix_length(text[start:start + size], query)
+
+        # insertion at i: text[start:start + i] == query[:i], the rest of the window == query[i:]
+        end = start + size + 1
+        if end <= len(text) and _is_word_boundary(text, end):
+            suffix = _common_suffix_length(text[start:end], query)
+            if size - suffix <= prefix:
+                return start, end
+
+        # substitution at i < size, the window keeps query[:i] and query[i + 1:]
+        end = start + size
+        if end <= len(text) and _is_word_boundary(text, end):
+            suffix = _common_suffix_length(text[start:end], query)
+            if max(0, size - 1 - suffix) <= min(prefix, size - 1):
+                return start, end
+
+        # deletion at i < size, the window is query[:i] + query[i + 1:]
+        end = start + size - 1
+        if end <= len(text) and _is_word_boundary(text, end):
+            suffix = _common_suffix_length(text[start:end], query)
+            if max(0, size - 1 - suffix) <= min(prefix, size - 1):
+                return start, end
+    return None
+
+
+@functools.lru_cache(maxsize=PERFECT_MATCH_CACHE_SIZE)
+def _perfect_match_pattern(query_lower: str) -> Optional[re.Pattern]:
+    """Compile the whole-word phrase pattern for `query_lower`, or None if it has no words."""
+    tokens = re.findall(r"\w+", query_lower)
+    if not tokens:
+        return None
+    return re.compile(r"\b" + r"\W+".join(map(re.escape, tokens)) + r"\b")
+
+
+@functools.lru_cache(maxsize=SCORE_CACHE_SIZE)
 def calc_score(query: str, match_text: str) -> int:
     """
         Spec-accurate scoring with exactly one edit allowed:
@@ -238,6 +667,8 @@ def calc_score(query: str, match_text: str) -> int:
           - Remove punctuation
           - Collapse multiple spaces to a single space
 
+        Scores are memoized, since many fuzzy hits share the same matched text.
+
         Args:
             query: Original user query string.
             match_text: The substring from a sentence that matched fuzzily.
@@ -245,10 +676,8 @@ def calc_score(query: str, match_text: str) -> int:
         Returns:
             Integer score (>= 0). Returns 0 if more than one edit would be required.
         """
-    table = str.maketrans('', '', string.punctuation)
-
     def norm(s: str) -> str:
-        return re.sub(r"\s+", " ", s.lower().translate(table)).strip()
+        return " ".join(s.lower().translate(PUNCTUATION_TABLE).split())
 
     q = norm(query)
     m = norm(match_text)
@@ -260,10 +689,9 @@ def calc_score(query: str, match_text: str) -> int:
         return 2 * len(q)
 
     if len(q) == len(m):
-        diffs = [i for i, (a, b) in enumerate(zip(q, m)) if a != b]
-        if len(diffs) != 1:
+        i = _common_prefix_length(q, m)
+        if q[i + 1:] != m[i + 1:]:
             return 0
-        i = diffs[0]
         base = 2 * (len(m))
         pen = incorrect_letter_penalty(i)
         return base - pen
@@ -273,48 +701,48 @@ def calc_score(query: str, match_text: str) -> int:
     else:
         l, s = m, q
 
-    k = None
-    i = j = 0
-    while i < len(l) and j < len(s):
-        if l[i] == s[j]:
-            i += 1
-            j += 1
-        else:
-            if k is not None:
-                return 0
-            k = i
-            i += 1
-    if k is None:
-        k = len(l) - 1
+    # the single skipped character of the longer string sits right after the common prefix
+    k = _common_prefix_length(l, s)
+    if l[k + 1:] != s[k:]:
+        return 0
 
     base = 2 * len(m)
     pen = missing_or_added_penalty(k)
     return base - pen
 
 
+def _common_prefix_length(a: str, b: str) -> int:
+    """Length of the longest common prefix of `a` and `b`.
+
+    Binary search over slice comparisons, so the characters are compared in C.
+    """
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix_length(a: str, b: str) -> int:
+    """Length of the longest common suffix of `a` and `b`, see `_common_prefix_length`."""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[-mid:] == b[-mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
 def incorrect_letter_penalty(position: int) -> int:
     """Penalty for incorrect letter at given 0-based position."""
-    if position == 0:
-        return 5
-    elif position == 1:
-        return 4
-    elif position == 2:
-        return 3
-    elif position == 3:
-        return 2
-    else:
-        return 1
+    return INCORRECT_LETTER_PENALTIES[min(position, len(INCORRECT_LETTER_PENALTIES) - 1)]
 
 
 def missing_or_added_penalty(position: int) -> int:
     """Penalty for missing or added letter at given 0-based position."""
-    if position == 0:
-        return 10
-    elif position == 1:
-        return 8
-    elif position == 2:
-        return 6
-    elif position == 3:
-        return 4
-    else:
-        return 2
+    return MISSING_OR_ADDED_PENALTIES[min(position, len(MISSING_OR_ADDED_PENALTIES) - 1)]
@@ -1,11 +1,15 @@
 import pytest
 import auto_completor
+import random
+import re
+import statistics
+import string
 import time
 
 ARCHIVE_DIRECTORY = "../Archive"
 
 
-@pytest.fixture
+@pytest.fixture(scope="session")
 def completor():
     completor = auto_completor.AutoCompletor(ARCHIVE_DIRECTORY)
     return completor
@@ -24,6 +28,8 @@ def test_input_with_whitespace(completor):
     input_text_with_whitespace = "this           is   "
     input_text_without_whitespace = "this is"
     completions_with_whitespace = completor.get_best_k_completions(input_text_with_whitespace)
+    # both inputs share one cache entry, search again instead of comparing it with itself
+    completor.clear_cache()
     completions_without_whitespace = completor.get_best_k_completions(input_text_without_whitespace)
     reprs_with_whitespace = [repr(c) for c in completions_with_whitespace]
     reprs_without_whitespace = [repr(c) for c in completions_without_whitespace]
@@ -35,6 +41,8 @@ def test_input_with_symbols(completor):
     input_text_with_symbols = "my, name, is"
     input_text_without_symbols = "my name is"
     completions_with_symbols = completor.get_best_k_completions(input_text_with_symbols)
+    # both inputs share one cache entry, search again instead of comparing it with itself
+    completor.clear_cache()
     completions_without_symbols = completor.get_best_k_completions(input_text_without_symbols)
     reprs_with_symbols = [repr(c) for c in completions_with_symbols]
     reprs_without_symbols = [repr(c) for c in completions_without_symbols]
@@ -73,14 +81,173 @@ def test_completion_search_performance(completor):
         "introduction to machine learning"
     ]
 
-    durations = []
+    durations_ns = []
+
+    # the first query pays one-off costs (regex compilation, lazy lookups), keep it out of the timings
+    completor.get_best_k_completions("warmup")
+    # earlier tests share this completor, time real searches rather than cache hits
+    completor.clear_cache()
 
     for text in test_inputs:
-        start = time.perf_counter()
+        start = time.perf_counter_ns()
         completor.get_best_k_completions(text)
-        durations.append(time.perf_counter() - start)
+        durations_ns.append(time.perf_counter_ns() - start)
 
+    durations = sorted(duration_ns / 1e9 for duration_ns in durations_ns)
     avg_duration = sum(durations) / len(durations)
+    median_duration = statistics.median(durations)
+    p95_duration = durations[int(0.95 * (len(durations) - 1))]
+    max_duration = durations[-1]
 
     print(f"\nAverage autocomplete time over {len(test_inputs)} inputs: {avg_duration:.3f} seconds")
-    assert avg_duration < 5.5
+    print(f"Median autocomplete time over {len(test_inputs)} inputs: {median_duration:.3f} seconds")
+    print(f"p95 / max autocomplete time: {p95_duration:.3f} / {max_duration:.3f} seconds")
+    # a slow query is what the user feels, so bound the tail and every single query
+    assert p95_duration < 2.0, f"p95={p95_duration:.3f}s"
+    assert max_duration < 5.5, f"max={max_duration:.3f}s"
+
+
+@pytest.mark.parametrize("lines", [None, "\n\n  \n"])
+def test_archive_without_sentences(tmp_path, monkeypatch, lines):
+    # the cache file is written to the working directory, keep it next to the small archive
+    monkeypatch.chdir(tmp_path)
+    archive = tmp_path / "Archive"
+    archive.mkdir()
+    if lines is not None:
+        (archive / "blank.txt").write_text(lines)
+    empty_completor = auto_completor.AutoCompletor(str(archive))
+    for input_text in ["a", "", "ab", "a b"]:
+        assert empty_completor.get_best_k_completions(input_text) == []
+
+
+def test_missing_archive(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    missing_completor = auto_completor.AutoCompletor(str(tmp_path / "nope"))
+    assert len(missing_completor.sentences) == 0
+    assert missing_completor.get_best_k_completions("a") == []
+
+
+def test_find_one_edit_match_agrees_with_regex():
+    # find_one_edit_match replaces the fuzzy regex for ASCII text, so it must report the same span
+    rng = random.Random(0)
+    for _ in range(2000):
+        query = "".join(rng.choice("ab -") for _ in range(rng.randint(2, 6)))
+        regex = auto_completor._build_fuzzy_regex(query)
+        for _ in range(25):
+            text = "".join(rng.choice("ab -.1") for _ in range(rng.randint(0, 16)))
+            m = regex.search(text)
+            assert auto_completor.find_one_edit_match(query, text) == (m.span() if m else None), (query, text)
+
+
+FUZZY_SENTENCES = [
+    "Learn shell scripting today.",
+    "Shell Scripting In Caps",
+    "shellscripting is one word here",
+    "shellxscripting with a letter",
+    "shell-scripting with a hyphen",
+    "the shell scripts run",
+    "run the shell now",
+    "runthe shell fast",
+    "run the-shell slowly",
+    "run tha shell again",
+    "rn the shel",
+    "python programming language basics",
+    "pythonprogramming language",
+    "python programing language",
+    "python pro-gramming language",
+    "a completely unrelated line",
+    # re.IGNORECASE folds more than str.lower(): ı/i, ſ/s, ς/σ, and İ matches i
+    "Martı\u0301n Abadi and the team",
+    "the ſhell ſcripting guide",
+    "ſhellſcripting glued together",
+    "MARTİN International",
+    "ΣΟΦΟΣ and σοφος",
+]
+
+
+def one_edit_variants(query):
+    variants = {query}
+    for i in range(len(query) + 1):
+        variants.add(query[:i] + query[i + 1:])
+        for char in "ax -":
+            variants.add(query[:i] + char + query[i:])
+            variants.add(query[:i] + char + query[i + 1:])
+    return variants
+
+
+def test_indexed_fuzzy_candidates_cover_regex_matches(tmp_path, monkeypatch):
+    # the cache file is written to the working directory, keep it next to the small archive
+    monkeypatch.chdir(tmp_path)
+    archive = tmp_path / "Archive"
+    archive.mkdir()
+    (archive / "fuzzy.txt").write_text("\n".join(FUZZY_SENTENCES) + "\n", encoding="utf-8")
+    # never fall back to the buffer scan, the postings have to cover every match on their own
+    monkeypatch.setattr(auto_completor, "POSTINGS_SCAN_RATIO", 0)
+    small_completor = auto_completor.AutoCompletor(str(archive))
+    contents = small_completor.sentences.contents
+
+    # one, two and three words; the text holds space-deleted, space-substituted and split variants
+    base_queries = ["shell scripting", "shellscripting", "scripting", "run the shell",
+                    "python programming language", "programming", "python programming",
+                    "ma rti", "martin", "ſhell", "shell ſcripting", "σοφος", "martın",
+                    # punctuation cannot be looked up in the postings, these scan the buffer halves
+                    "ſhell!", "shell-ſcripting", "the-ſhell", "ΣΟΦΟΣ!"]
+    checked = 0
+    for base_query in base_queries:
+        for query in one_edit_variants(base_query):
+            query = auto_completor._normalize_query(query)
+            ids = small_completor._fuzzy_candidate_ids(query)
+            regex = auto_completor._build_fuzzy_regex(query)
+            matched = {index for index, content in enumerate(contents) if regex.search(content)}
+            assert matched <= set(ids), (query, [contents[index] for index in matched - set(ids)])
+            checked += bool(matched)
+    assert checked > 100
+
+
+def reference_calc_score(query, match_text):
+    # the character-by-character scoring calc_score was derived from
+    def norm(s):
+        return re.sub(r"\s+", " ", s.lower().translate(str.maketrans('', '', string.punctuation))).strip()
+
+    q, m = norm(query), norm(match_text)
+    if abs(len(q) - len(m)) > 1:
+        return 0
+    if q == m:
+        return 2 * len(q)
+    if len(q) == len(m):
+        diffs = [i for i, (a, b) in enumerate(zip(q, m)) if a != b]
+        if len(diffs) != 1:
+            return 0
+        return 2 * len(m) - [5, 4, 3, 2, 1][min(diffs[0], 4)]
+    longer, shorter = (q, m) if len(q) > len(m) else (m, q)
+    skipped = None
+    i = j = 0
+    while i < len(longer) and j < len(shorter):
+        if longer[i] == shorter[j]:
+            i += 1
+            j += 1
+        else:
+            if skipped is not None:
+                return 0
+            skipped = i
+            i += 1
+    if skipped is None:
+        skipped = len(longer) - 1
+    return 2 * len(m) - [10, 8, 6, 4, 2][min(skipped, 4)]
+
+
+def test_calc_score_agrees_with_reference():
+    rng = random.Random(0)
+    for _ in range(30000):
+        query = "".join(rng.choice("abA ,.") for _ in range(rng.randint(0, 8)))
+        position = rng.randint(0, len(query))
+        edit = rng.choice(["insert", "substitute", "delete", "random"])
+        if edit == "insert":
+            match_text = query[:position] + rng.choice("ab ,") + query[position:]
+        elif edit == "substitute":
+            match_text = query[:position] + rng.choice("ab ,") + query[position + 1:]
+        elif edit == "delete":
+            match_text = query[:position] + query[position + 1:]
+        else:
+            match_text = "".join(rng.choice("abB .") for _ in range(rng.randint(0, 8)))
+        assert auto_completor.calc_score(query, match_text) == reference_calc_score(query, match_text), (query, match_text)